@@ -3,7 +3,10 @@
 使用Flask创建交互式界面
 """
 
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, request, Response
+import orjson
+import base64
+import threading
 import sys
 import os
 
@@ -12,10 +15,24 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from data_collector import FuturesDataCollector
 from technical_indicators import TechnicalIndicators
+from data_visualization import DataVisualizer
 import pandas as pd
 
 app = Flask(__name__)
 collector = FuturesDataCollector()
+visualizer = DataVisualizer(output_dir=os.path.join(os.path.dirname(__file__), 'output'))
+
+# pyplot不是线程安全的，多线程服务器下图表需逐个渲染
+_chart_lock = threading.Lock()
+
+# 图表缓存，按行情数据的获取时间区分，同一批数据只渲染一次
+_CHART_CACHE = {'ts': None, 'charts': None}
+
+
+def _json_response(payload):
+    """使用orjson序列化响应（可直接处理numpy类型）"""
+    return Response(orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY),
+                    mimetype='application/json')
 
 
 @app.route('/')
@@ -24,22 +41,67 @@ def index():
     return render_template('index.html')
 
 
+def _build_futures_data(df, columnar=False):
+    """构建行情数据部分，columnar为True时按列返回 {列名: [值, ...]}"""
+    if columnar:
+        data = {col: df[col].tolist() for col in df.columns}
+    else:
+        data = df.to_dict('records')
+
+    return {
+        'data': data,
+        'update_time': df['更新时间'].iloc[0] if len(df) > 0 else ''
+    }
+
+
+def _is_columnar():
+    """请求参数 ?format=columnar 时使用按列格式返回行情数据"""
+    return request.args.get('format') == 'columnar'
+
+
+def _build_main_contract(indexed=None):
+    """构建主力合约部分，未找到时返回None"""
+    main = collector.get_by_code('APM', indexed)
+    if main is not None:
+        return main.to_dict()
+    return None
+
+
+@app.route('/api/snapshot')
+def get_snapshot():
+    """一次性获取行情数据、技术分析和主力合约详情"""
+    try:
+        # 行情、分析和主力合约使用同一批缓存数据
+        df, indexed, _ = collector.fetch_apple_futures_snapshot()
+
+        futures_data = _build_futures_data(df, _is_columnar())
+
+        return _json_response({
+            'success': True,
+            'data': futures_data['data'],
+            'update_time': futures_data['update_time'],
+            'analysis': TechnicalIndicators.analyze_trend(df),
+            'main': _build_main_contract(indexed)
+        })
+    except Exception as e:
+        return _json_response({
+            'success': False,
+            'error': str(e)
+        })
+
+
 @app.route('/api/futures-data')
 def get_futures_data():
     """获取期货数据API"""
     try:
         df = collector.fetch_apple_futures()
 
-        # 转换为JSON格式
-        data = df.to_dict('records')
-
-        return jsonify({
+        return _json_response({
             'success': True,
-            'data': data,
-            'update_time': df['更新时间'].iloc[0] if len(df) > 0 else ''
+            **_build_futures_data(df, _is_columnar())
         })
     except Exception as e:
-        return jsonify({
+        return _json_response({
             'success': False,
             'error': str(e)
         })
@@ -54,12 +116,12 @@ def get_technical_analysis():
         # 进行技术分析
         analysis = TechnicalIndicators.analyze_trend(df)
 
-        return jsonify({
+        return _json_response({
             'success': True,
             'analysis': analysis
         })
     except Exception as e:
-        return jsonify({
+        return _json_response({
             'success': False,
             'error': str(e)
         })
@@ -69,24 +131,54 @@ def get_technical_analysis():
 def get_main_contract():
     """获取主力合约详情"""
     try:
-        df = collector.fetch_apple_futures()
-
-        # 筛选主力合约
-        main = df[df['合约代码'] == 'APM']
+        # 按合约代码查找主力合约
+        data = _build_main_contract()
 
-        if len(main) > 0:
-            data = main.iloc[0].to_dict()
-            return jsonify({
+        if data is not None:
+            return _json_response({
                 'success': True,
                 'data': data
             })
         else:
-            return jsonify({
+            return _json_response({
                 'success': False,
                 'error': '未找到主力合约'
             })
     except Exception as e:
-        return jsonify({
+        return _json_response({
+            'success': False,
+            'error': str(e)
+        })
+
+
+@app.route('/api/charts')
+def get_charts():
+    """获取图表API（PNG经base64编码后内嵌在JSON中）"""
+    try:
+        df, _, ts = collector.fetch_apple_futures_snapshot()
+
+        with _chart_lock:
+            if _CHART_CACHE['ts'] != ts:
+                charts = {
+                    'price_comparison': visualizer.plot_price_comparison(df, save=False),
+                    'volume_analysis': visualizer.plot_volume_analysis(df, save=False),
+                    'price_range': visualizer.plot_price_range(df, save=False),
+                    'market_heatmap': visualizer.plot_market_heatmap(df, save=False),
+                    'dashboard': visualizer.plot_comprehensive_dashboard(df, save=False),
+                }
+                _CHART_CACHE['charts'] = {
+                    name: base64.b64encode(png).decode('ascii') if png is not None else None
+                    for name, png in charts.items()
+                }
+                _CHART_CACHE['ts'] = ts
+            encoded = _CHART_CACHE['charts']
+
+        return _json_response({
+            'success': True,
+            'charts': encoded
+        })
+    except Exception as e:
+        return _json_response({
             'success': False,
             'error': str(e)
         })
@@ -97,4 +189,16 @@ if __name__ == '__main__':
     print("期货数据分析系统启动中...")
     print("请在浏览器中访问: http://127.0.0.1:5000")
     print("="*80)
-    app.run(debug=True, host='0.0.0.0', port=5000)
+
+    if os.environ.get('DEV'):
+        # 开发模式：Flask调试服务器（自动重载）
+        app.run(debug=True, host='0.0.0.0', port=5000)
+    else:
+        # 生产模式：多线程WSGI服务器，支持并发请求
+        try:
+            from waitress import serve
+        except ImportError:
+            print("未安装waitress，改用Flask内置服务器（pip install -r requirements.txt）")
+            app.run(host='0.0.0.0', port=5000, threaded=True)
+        else:
+            serve(app, host='0.0.0.0', port=5000, threads=8)
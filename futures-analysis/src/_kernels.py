@@ -0,0 +1,51 @@
+"""
+数值计算内核
+使用Numba JIT编译逐元素递推的指标计算
+"""
+
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True)
+def wilder_ema(x, period):
+    """
+    Wilder平滑 (alpha = 1/period 的指数移动平均)
+
+    以前period个有效值的简单平均作为初始值，之后按
+    ema = ema + (x - ema) / period 递推；NaN不参与计算，沿用上一期结果。
+
+    Args:
+        x: 输入数组 (float64)
+        period: 周期
+
+    Returns:
+        numpy.ndarray: 平滑结果，初始值之前为NaN
+    """
+    n = x.shape[0]
+    out = np.empty_like(x)
+    out[:] = np.nan
+
+    # 用前period个有效值的平均作为初始值
+    total = 0.0
+    count = 0
+    i = 0
+    while i < n and count < period:
+        if not np.isnan(x[i]):
+            total += x[i]
+            count += 1
+        i += 1
+
+    if count < period:
+        return out
+
+    prev = total / period
+    out[i - 1] = prev
+
+    alpha = 1.0 / period
+    for j in range(i, n):
+        if not np.isnan(x[j]):
+            prev += alpha * (x[j] - prev)
+        out[j] = prev
+
+    return out
@@ -4,10 +4,40 @@
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import aiohttp
+import asyncio
 import pandas as pd
 from datetime import datetime
 import json
 import time
+import threading
+
+# 行情缓存（进程内共享，按期货行情刷新节奏设置较短的有效期）
+# entry为 (行情数据, 按合约代码索引的行情数据, 获取时刻(time.monotonic))，整体替换以保证读取一致
+_CACHE = {'entry': None}
+_CACHE_LOCK = threading.Lock()
+_TTL = 5.0
+
+# 请求超时 (连接, 读取)，秒；缓存刷新在锁内进行，需保证最坏耗时在10秒以内
+REQUEST_TIMEOUT = (3, 5)
+
+# 接口字段映射: (列名, 接口字段, 默认值)
+FIELD_MAPPING = [
+    ('合约代码', 'dm', ''),
+    ('合约名称', 'name', ''),
+    ('最新价', 'p', 0),
+    ('涨跌额', 'zd', 0),
+    ('涨跌幅', 'zde', 0),
+    ('今开', 'o', 0),
+    ('最高', 'h', 0),
+    ('最低', 'l', 0),
+    ('昨结', 'st', 0),
+    ('成交量', 'v', 0),
+    ('成交额', 'amt', 0),
+    ('持仓量', 'oi', 0),
+]
 
 
 class FuturesDataCollector:
@@ -15,54 +45,94 @@ class FuturesDataCollector:
 
     def __init__(self):
         self.base_url = "http://futsseapi.eastmoney.com/list/block/futures"
+        # 东方财富期货API
+        self.api_url = "http://futsseapi.eastmoney.com/list/block/112"
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
             'Referer': 'http://quote.eastmoney.com/'
         }
 
+        # 复用连接的会话，轮询采集时避免每次重新建立连接
+        # 仅对连接失败重试一次，读取超时不重试
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8,
+                              max_retries=Retry(total=1, read=0, backoff_factor=0.2))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
     def fetch_apple_futures(self):
         """
-        获取苹果期货实时行情数据
+        获取苹果期货实时行情数据（带短时缓存，有效期内重复调用直接返回缓存数据）
 
         Returns:
             pandas.DataFrame: 包含期货行情的数据框
         """
-        try:
-            # 东方财富期货API
-            api_url = "http://futsseapi.eastmoney.com/list/block/112"
+        df, _, _ = self.fetch_apple_futures_snapshot()
+        return df
+
+    def fetch_apple_futures_snapshot(self):
+        """
+        一次读取缓存中的行情数据、合约代码索引和获取时间，三者属于同一批数据
+
+        Returns:
+            tuple: (行情DataFrame, 按合约代码索引的DataFrame, 获取时刻，time.monotonic()，仅用于比较是否为同一批数据)
+        """
+        df, indexed, ts = self._refresh_cache()
+        return df.copy(deep=False), indexed, ts
+
+    def get_by_code(self, code, indexed=None):
+        """
+        按合约代码获取单个合约的行情（基于缓存的索引查找）
+
+        Args:
+            code: 合约代码，如 'APM'
+            indexed: 可选，fetch_apple_futures_snapshot()返回的索引，
+                     传入时与已取得的行情数据保持一致，不再读取缓存
+
+        Returns:
+            pandas.Series: 合约行情，未找到时返回None
+        """
+        if indexed is None:
+            _, indexed, _ = self._refresh_cache()
+        if code not in indexed.index:
+            return None
+        return indexed.loc[code]
 
-            response = requests.get(api_url, headers=self.headers, timeout=10)
+    def _refresh_cache(self):
+        """
+        缓存过期时重新获取行情数据，并建立按合约代码的索引
+
+        Returns:
+            tuple: 当前缓存条目 (行情数据, 按合约代码索引的行情数据, 获取时间)
+        """
+        entry = _CACHE['entry']
+        if entry is not None and time.monotonic() - entry[2] < _TTL:
+            return entry
+
+        # 加锁保证同一时刻只有一个请求访问上游接口
+        with _CACHE_LOCK:
+            entry = _CACHE['entry']
+            if entry is None or time.monotonic() - entry[2] >= _TTL:
+                df = self._fetch_apple_futures()
+                # 合约代码重复时保留第一条
+                unique = df.loc[~df['合约代码'].duplicated()]
+                entry = (df, unique.set_index('合约代码', drop=False), time.monotonic())
+                _CACHE['entry'] = entry
+            return entry
+
+    def _fetch_apple_futures(self):
+        """
+        从东方财富接口获取苹果期货实时行情数据
+
+        Returns:
+            pandas.DataFrame: 包含期货行情的数据框
+        """
+        try:
+            response = self.session.get(self.api_url, timeout=REQUEST_TIMEOUT)
 
             if response.status_code == 200:
-                data = response.json()
-
-                if 'list' in data:
-                    futures_list = data['list']
-
-                    # 解析数据
-                    parsed_data = []
-                    for item in futures_list:
-                        parsed_data.append({
-                            '合约代码': item.get('dm', ''),
-                            '合约名称': item.get('name', ''),
-                            '最新价': item.get('p', 0),
-                            '涨跌额': item.get('zd', 0),
-                            '涨跌幅': item.get('zde', 0),
-                            '今开': item.get('o', 0),
-                            '最高': item.get('h', 0),
-                            '最低': item.get('l', 0),
-                            '昨结': item.get('st', 0),
-                            '成交量': item.get('v', 0),
-                            '成交额': item.get('amt', 0),
-                            '持仓量': item.get('oi', 0),
-                            '更新时间': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        })
-
-                    df = pd.DataFrame(parsed_data)
-                    return df
-                else:
-                    print("API返回数据格式异常")
-                    return self._create_sample_data()
+                return self._parse_futures_data(response.json())
             else:
                 print(f"请求失败，状态码: {response.status_code}")
                 return self._create_sample_data()
@@ -71,6 +141,59 @@ class FuturesDataCollector:
             print(f"数据采集出错: {str(e)}")
             return self._create_sample_data()
 
+    async def fetch_apple_futures_async(self, session):
+        """
+        异步获取苹果期货实时行情数据
+
+        Args:
+            session: aiohttp.ClientSession，多次采集时复用同一连接
+
+        Returns:
+            pandas.DataFrame: 包含期货行情的数据框
+        """
+        try:
+            timeout = aiohttp.ClientTimeout(total=10)
+            async with session.get(self.api_url, headers=self.headers, timeout=timeout) as response:
+                if response.status == 200:
+                    data = await response.json(content_type=None)
+                    return self._parse_futures_data(data)
+                else:
+                    print(f"请求失败，状态码: {response.status}")
+                    return self._create_sample_data()
+
+        except Exception as e:
+            print(f"数据采集出错: {str(e)}")
+            return self._create_sample_data()
+
+    def _parse_futures_data(self, data):
+        """
+        解析接口返回的行情数据
+
+        Args:
+            data: 接口返回的JSON数据
+
+        Returns:
+            pandas.DataFrame: 包含期货行情的数据框
+        """
+        if 'list' not in data:
+            print("API返回数据格式异常")
+            return self._create_sample_data()
+
+        futures_list = data['list']
+
+        # 同一批数据共用一个更新时间
+        now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        # 按列解析数据
+        columns = {
+            name: [item.get(key, default) for item in futures_list]
+            for name, key, default in FIELD_MAPPING
+        }
+        columns['更新时间'] = [now_str] * len(futures_list)
+
+        df = pd.DataFrame(columns)
+        return df
+
     def _create_sample_data(self):
         """
         创建示例数据（当无法获取真实数据时使用）
@@ -129,6 +252,26 @@ class FuturesDataCollector:
         """
         持续采集历史数据
 
+        同步接口，内部通过asyncio.run运行，不能在已有事件循环的线程中调用
+        （如Jupyter、异步服务），此时请直接 await collect_historical_data_async()
+
+        Args:
+            interval_seconds: 采集间隔（秒）
+            duration_minutes: 采集时长（分钟）
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError("当前线程已有运行中的事件循环，请使用 await collect_historical_data_async()")
+
+        return asyncio.run(self.collect_historical_data_async(interval_seconds, duration_minutes))
+
+    async def collect_historical_data_async(self, interval_seconds=60, duration_minutes=60):
+        """
+        异步持续采集历史数据，等待期间不阻塞事件循环
+
         Args:
             interval_seconds: 采集间隔（秒）
             duration_minutes: 采集时长（分钟）
@@ -138,11 +281,13 @@ class FuturesDataCollector:
         all_data = []
         end_time = time.time() + (duration_minutes * 60)
 
-        while time.time() < end_time:
-            df = self.fetch_apple_futures()
-            all_data.append(df)
-            print(f"已采集 {len(all_data)} 次数据")
-            time.sleep(interval_seconds)
+        # 复用同一会话，避免每次采集重新建立连接
+        async with aiohttp.ClientSession() as session:
+            while time.time() < end_time:
+                df = await self.fetch_apple_futures_async(session)
+                all_data.append(df)
+                print(f"已采集 {len(all_data)} 次数据")
+                await asyncio.sleep(interval_seconds)
 
         # 合并所有数据
         combined_df = pd.concat(all_data, ignore_index=True)
@@ -3,187 +3,268 @@
 使用matplotlib和plotly创建各种图表
 """
 
+import matplotlib
+matplotlib.use('Agg')  # 无界面后端，仅渲染图片
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from matplotlib.font_manager import FontProperties
 import pandas as pd
 import numpy as np
 from datetime import datetime
+import io
 import os
 
 # 设置中文字体
 plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'Arial Unicode MS']
 plt.rcParams['axes.unicode_minus'] = False
 
+# 主要合约代码前缀（主连及6开头合约）
+MAIN_CONTRACT_PREFIXES = ('APM', 'AP6')
+
+# 涨跌配色
+UP_COLOR = '#4CAF50'
+DOWN_COLOR = '#f44336'
+
+
+def change_colors(changes):
+    """根据涨跌幅数组生成柱状图颜色（上涨绿色，其余红色）"""
+    return np.where(changes > 0, UP_COLOR, DOWN_COLOR)
+
+
+def _to_png_bytes(fig, dpi=100):
+    """将图表渲染为PNG字节并释放Figure"""
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+    return buf.getvalue()
+
 
 class DataVisualizer:
     """数据可视化工具类"""
 
     def __init__(self, output_dir='../output'):
         self.output_dir = output_dir
-        os.makedirs(output_dir, exist_ok=True)
 
-    def plot_price_comparison(self, df, save=True):
+    @staticmethod
+    def _get_main_contracts(df):
+        """
+        筛选主要合约（合约代码以主连或6开头）
+
+        Args:
+            df: 期货数据DataFrame
+
+        Returns:
+            pandas.DataFrame: 主要合约数据
+        """
+        mask = df['合约代码'].str.startswith(MAIN_CONTRACT_PREFIXES)
+        return df.loc[mask]
+
+    def _save(self, png_bytes, name):
+        """
+        将PNG字节写入输出目录
+
+        Args:
+            png_bytes: PNG图片数据
+            name: 文件名
+
+        Returns:
+            str: 保存路径
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        filepath = os.path.join(self.output_dir, name)
+        with open(filepath, 'wb') as f:
+            f.write(png_bytes)
+        return filepath
+
+    def plot_price_comparison(self, df, save=True, high_res=False):
         """
         绘制价格对比图
 
         Args:
             df: 期货数据DataFrame
             save: 是否保存图片
+            high_res: 是否以高分辨率(300 DPI)渲染，默认100 DPI
+
+        Returns:
+            bytes: PNG图片数据
         """
         fig, ax = plt.subplots(figsize=(14, 8))
 
         # 提取主要合约
-        main_contracts = df[df['合约代码'].str.contains('APM|AP6')]
+        main_contracts = self._get_main_contracts(df)
 
         if len(main_contracts) == 0:
             print("没有找到主要合约数据")
+            plt.close(fig)
             return
 
+        # 提取绘图所需列
+        prices = main_contracts['最新价'].to_numpy()
+        changes = main_contracts['涨跌幅'].to_numpy()
+        names = main_contracts['合约名称'].to_numpy()
+
         # 绘制柱状图
         x = range(len(main_contracts))
-        colors = ['#4CAF50' if val > 0 else '#f44336' for val in main_contracts['涨跌幅']]
+        colors = change_colors(changes)
 
-        bars = ax.bar(x, main_contracts['最新价'], color=colors, alpha=0.7, edgecolor='black')
+        bars = ax.bar(x, prices, color=colors, alpha=0.7, edgecolor='black')
 
         # 在柱子上方显示涨跌幅
-        for i, (idx, row) in enumerate(main_contracts.iterrows()):
-            height = row['最新价']
-            change = row['涨跌幅']
-            label = f"{change:+.2f}%"
-            ax.text(i, height, label, ha='center', va='bottom', fontsize=10, fontweight='bold')
+        labels = [f"{change:+.2f}%" for change in changes]
+        ax.bar_label(bars, labels=labels, fontsize=10, fontweight='bold')
 
         # 设置标签
         ax.set_xlabel('合约代码', fontsize=12, fontweight='bold')
         ax.set_ylabel('最新价 (元/吨)', fontsize=12, fontweight='bold')
         ax.set_title('苹果期货合约价格对比', fontsize=16, fontweight='bold', pad=20)
         ax.set_xticks(x)
-        ax.set_xticklabels(main_contracts['合约名称'], rotation=45, ha='right')
+        ax.set_xticklabels(names, rotation=45, ha='right')
 
         # 添加网格
         ax.grid(True, alpha=0.3, linestyle='--')
 
         plt.tight_layout()
 
+        png_bytes = _to_png_bytes(fig, dpi=300 if high_res else 100)
+
         if save:
-            filepath = os.path.join(self.output_dir, 'price_comparison.png')
-            plt.savefig(filepath, dpi=300, bbox_inches='tight')
+            filepath = self._save(png_bytes, 'price_comparison.png')
             print(f"图表已保存: {filepath}")
 
-        plt.show()
-        return fig
+        return png_bytes
 
-    def plot_volume_analysis(self, df, save=True):
+    def plot_volume_analysis(self, df, save=True, high_res=False):
         """
         绘制成交量分析图
 
         Args:
             df: 期货数据DataFrame
             save: 是否保存图片
+            high_res: 是否以高分辨率(300 DPI)渲染，默认100 DPI
+
+        Returns:
+            bytes: PNG图片数据
         """
         fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10))
 
-        main_contracts = df[df['合约代码'].str.contains('APM|AP6')].head(6)
+        main_contracts = self._get_main_contracts(df).head(6)
 
         if len(main_contracts) == 0:
             print("没有找到主要合约数据")
+            plt.close(fig)
             return
 
+        # 提取绘图所需列
+        names = main_contracts['合约名称'].to_numpy()
+        volumes = main_contracts['成交量'].to_numpy()
+        open_interest = main_contracts['持仓量'].to_numpy()
+
         # 图1: 成交量
         x = range(len(main_contracts))
-        bars1 = ax1.bar(x, main_contracts['成交量'], color='#2196F3', alpha=0.7, edgecolor='black')
+        bars1 = ax1.bar(x, volumes, color='#2196F3', alpha=0.7, edgecolor='black')
 
         ax1.set_xlabel('合约代码', fontsize=12, fontweight='bold')
         ax1.set_ylabel('成交量 (手)', fontsize=12, fontweight='bold')
         ax1.set_title('苹果期货成交量分析', fontsize=14, fontweight='bold')
         ax1.set_xticks(x)
-        ax1.set_xticklabels(main_contracts['合约名称'], rotation=45, ha='right')
+        ax1.set_xticklabels(names, rotation=45, ha='right')
         ax1.grid(True, alpha=0.3, linestyle='--')
 
         # 添加数值标签
-        for i, (idx, row) in enumerate(main_contracts.iterrows()):
-            volume = row['成交量']
-            label = f"{volume:,.0f}"
-            ax1.text(i, volume, label, ha='center', va='bottom', fontsize=9)
+        labels1 = [f"{volume:,.0f}" for volume in volumes]
+        ax1.bar_label(bars1, labels=labels1, fontsize=9)
 
         # 图2: 持仓量
-        bars2 = ax2.bar(x, main_contracts['持仓量'], color='#FF9800', alpha=0.7, edgecolor='black')
+        bars2 = ax2.bar(x, open_interest, color='#FF9800', alpha=0.7, edgecolor='black')
 
         ax2.set_xlabel('合约代码', fontsize=12, fontweight='bold')
         ax2.set_ylabel('持仓量 (手)', fontsize=12, fontweight='bold')
         ax2.set_title('苹果期货持仓量分析', fontsize=14, fontweight='bold')
         ax2.set_xticks(x)
-        ax2.set_xticklabels(main_contracts['合约名称'], rotation=45, ha='right')
+        ax2.set_xticklabels(names, rotation=45, ha='right')
         ax2.grid(True, alpha=0.3, linestyle='--')
 
         # 添加数值标签
-        for i, (idx, row) in enumerate(main_contracts.iterrows()):
-            oi = row['持仓量']
-            label = f"{oi:,.0f}"
-            ax2.text(i, oi, label, ha='center', va='bottom', fontsize=9)
+        labels2 = [f"{oi:,.0f}" for oi in open_interest]
+        ax2.bar_label(bars2, labels=labels2, fontsize=9)
 
         plt.tight_layout()
 
+        png_bytes = _to_png_bytes(fig, dpi=300 if high_res else 100)
+
         if save:
-            filepath = os.path.join(self.output_dir, 'volume_analysis.png')
-            plt.savefig(filepath, dpi=300, bbox_inches='tight')
+            filepath = self._save(png_bytes, 'volume_analysis.png')
             print(f"图表已保存: {filepath}")
 
-        plt.show()
-        return fig
+        return png_bytes
 
-    def plot_price_range(self, df, save=True):
+    def plot_price_range(self, df, save=True, high_res=False):
         """
         绘制价格区间图（最高、最低、最新价）
 
         Args:
             df: 期货数据DataFrame
             save: 是否保存图片
+            high_res: 是否以高分辨率(300 DPI)渲染，默认100 DPI
+
+        Returns:
+            bytes: PNG图片数据
         """
         fig, ax = plt.subplots(figsize=(14, 8))
 
-        main_contracts = df[df['合约代码'].str.contains('APM|AP6')].head(6)
+        main_contracts = self._get_main_contracts(df).head(6)
 
         if len(main_contracts) == 0:
             print("没有找到主要合约数据")
+            plt.close(fig)
             return
 
+        # 提取绘图所需列
+        prices = main_contracts['最新价'].to_numpy()
+        names = main_contracts['合约名称'].to_numpy()
+        highs = main_contracts['最高'].to_numpy()
+        lows = main_contracts['最低'].to_numpy()
+
         x = range(len(main_contracts))
         width = 0.25
 
         # 绘制最高、最低、最新价
-        bars1 = ax.bar([i - width for i in x], main_contracts['最高'], width,
+        bars1 = ax.bar([i - width for i in x], highs, width,
                        label='最高价', color='#4CAF50', alpha=0.7)
-        bars2 = ax.bar(x, main_contracts['最新价'], width,
+        bars2 = ax.bar(x, prices, width,
                        label='最新价', color='#2196F3', alpha=0.7)
-        bars3 = ax.bar([i + width for i in x], main_contracts['最低'], width,
+        bars3 = ax.bar([i + width for i in x], lows, width,
                        label='最低价', color='#f44336', alpha=0.7)
 
         ax.set_xlabel('合约代码', fontsize=12, fontweight='bold')
         ax.set_ylabel('价格 (元/吨)', fontsize=12, fontweight='bold')
         ax.set_title('苹果期货价格区间分析', fontsize=16, fontweight='bold', pad=20)
         ax.set_xticks(x)
-        ax.set_xticklabels(main_contracts['合约名称'], rotation=45, ha='right')
+        ax.set_xticklabels(names, rotation=45, ha='right')
         ax.legend(fontsize=11)
         ax.grid(True, alpha=0.3, linestyle='--')
 
         plt.tight_layout()
 
+        png_bytes = _to_png_bytes(fig, dpi=300 if high_res else 100)
+
         if save:
-            filepath = os.path.join(self.output_dir, 'price_range.png')
-            plt.savefig(filepath, dpi=300, bbox_inches='tight')
+            filepath = self._save(png_bytes, 'price_range.png')
             print(f"图表已保存: {filepath}")
 
-        plt.show()
-        return fig
+        return png_bytes
 
-    def plot_market_heatmap(self, df, save=True):
+    def plot_market_heatmap(self, df, save=True, high_res=False):
         """
         绘制市场热力图（涨跌幅）
 
         Args:
             df: 期货数据DataFrame
             save: 是否保存图片
+            high_res: 是否以高分辨率(300 DPI)渲染，默认100 DPI
+
+        Returns:
+            bytes: PNG图片数据
         """
         fig, ax = plt.subplots(figsize=(12, 6))
 
@@ -191,17 +272,20 @@ class DataVisualizer:
 
         if len(main_contracts) == 0:
             print("没有找到数据")
+            plt.close(fig)
             return
 
-        # 创建颜色映射
-        changes = main_contracts['涨跌幅'].values.reshape(1, -1)
+        # 提取绘图所需列
+        prices = main_contracts['最新价'].to_numpy()
+        changes = main_contracts['涨跌幅'].to_numpy()
+        names = main_contracts['合约名称'].to_numpy()
 
         # 使用红绿配色
-        im = ax.imshow(changes, cmap='RdYlGn', aspect='auto', vmin=-3, vmax=3)
+        im = ax.imshow(changes.reshape(1, -1), cmap='RdYlGn', aspect='auto', vmin=-3, vmax=3)
 
         # 设置刻度
         ax.set_xticks(range(len(main_contracts)))
-        ax.set_xticklabels(main_contracts['合约名称'], rotation=45, ha='right')
+        ax.set_xticklabels(names, rotation=45, ha='right')
         ax.set_yticks([])
 
         # 添加颜色条
@@ -209,82 +293,96 @@ class DataVisualizer:
         cbar.set_label('涨跌幅 (%)', fontsize=11)
 
         # 在每个单元格中显示数值
-        for i, (idx, row) in enumerate(main_contracts.iterrows()):
-            text = ax.text(i, 0, f"{row['涨跌幅']:.2f}%\n{row['最新价']:.0f}",
-                          ha="center", va="center", color="black", fontsize=10, fontweight='bold')
+        for i, (change, price) in enumerate(zip(changes, prices)):
+            ax.text(i, 0, f"{change:.2f}%\n{price:.0f}",
+                    ha="center", va="center", color="black", fontsize=10, fontweight='bold')
 
         ax.set_title('苹果期货市场涨跌热力图', fontsize=16, fontweight='bold', pad=20)
 
         plt.tight_layout()
 
+        png_bytes = _to_png_bytes(fig, dpi=300 if high_res else 100)
+
         if save:
-            filepath = os.path.join(self.output_dir, 'market_heatmap.png')
-            plt.savefig(filepath, dpi=300, bbox_inches='tight')
+            filepath = self._save(png_bytes, 'market_heatmap.png')
             print(f"图表已保存: {filepath}")
 
-        plt.show()
-        return fig
+        return png_bytes
 
-    def plot_comprehensive_dashboard(self, df, save=True):
+    def plot_comprehensive_dashboard(self, df, save=True, high_res=False):
         """
         绘制综合仪表板
 
         Args:
             df: 期货数据DataFrame
             save: 是否保存图片
+            high_res: 是否以高分辨率(300 DPI)渲染，默认100 DPI
+
+        Returns:
+            bytes: PNG图片数据
         """
         fig = plt.figure(figsize=(18, 12))
         gs = fig.add_gridspec(3, 2, hspace=0.3, wspace=0.3)
 
-        main_contracts = df[df['合约代码'].str.contains('APM|AP6')].head(6)
+        main_contracts = self._get_main_contracts(df).head(6)
 
         if len(main_contracts) == 0:
             print("没有找到主要合约数据")
+            plt.close(fig)
             return
 
+        # 提取绘图所需列
+        prices = main_contracts['最新价'].to_numpy()
+        changes = main_contracts['涨跌幅'].to_numpy()
+        names = main_contracts['合约名称'].to_numpy()
+        volumes = main_contracts['成交量'].to_numpy()
+        open_interest = main_contracts['持仓量'].to_numpy()
+        highs = main_contracts['最高'].to_numpy()
+        lows = main_contracts['最低'].to_numpy()
+
         # 1. 价格对比
         ax1 = fig.add_subplot(gs[0, 0])
         x = range(len(main_contracts))
-        colors = ['#4CAF50' if val > 0 else '#f44336' for val in main_contracts['涨跌幅']]
-        ax1.bar(x, main_contracts['最新价'], color=colors, alpha=0.7)
+        colors = change_colors(changes)
+        ax1.bar(x, prices, color=colors, alpha=0.7)
         ax1.set_title('价格对比', fontsize=12, fontweight='bold')
         ax1.set_xticks(x)
-        ax1.set_xticklabels(main_contracts['合约名称'], rotation=45, ha='right', fontsize=8)
+        ax1.set_xticklabels(names, rotation=45, ha='right', fontsize=8)
         ax1.grid(True, alpha=0.3)
 
         # 2. 涨跌幅分布
         ax2 = fig.add_subplot(gs[0, 1])
-        ax2.barh(range(len(main_contracts)), main_contracts['涨跌幅'], color=colors, alpha=0.7)
+        ax2.barh(range(len(main_contracts)), changes, color=colors, alpha=0.7)
         ax2.set_title('涨跌幅分布 (%)', fontsize=12, fontweight='bold')
         ax2.set_yticks(range(len(main_contracts)))
-        ax2.set_yticklabels(main_contracts['合约名称'], fontsize=8)
+        ax2.set_yticklabels(names, fontsize=8)
         ax2.grid(True, alpha=0.3)
 
         # 3. 成交量
         ax3 = fig.add_subplot(gs[1, 0])
-        ax3.bar(x, main_contracts['成交量'], color='#2196F3', alpha=0.7)
+        ax3.bar(x, volumes, color='#2196F3', alpha=0.7)
         ax3.set_title('成交量分析', fontsize=12, fontweight='bold')
         ax3.set_xticks(x)
-        ax3.set_xticklabels(main_contracts['合约名称'], rotation=45, ha='right', fontsize=8)
+        ax3.set_xticklabels(names, rotation=45, ha='right', fontsize=8)
         ax3.grid(True, alpha=0.3)
 
         # 4. 持仓量
         ax4 = fig.add_subplot(gs[1, 1])
-        ax4.bar(x, main_contracts['持仓量'], color='#FF9800', alpha=0.7)
+        ax4.bar(x, open_interest, color='#FF9800', alpha=0.7)
         ax4.set_title('持仓量分析', fontsize=12, fontweight='bold')
         ax4.set_xticks(x)
-        ax4.set_xticklabels(main_contracts['合约名称'], rotation=45, ha='right', fontsize=8)
+        ax4.set_xticklabels(names, rotation=45, ha='right', fontsize=8)
         ax4.grid(True, alpha=0.3)
 
         # 5. 价格区间
         ax5 = fig.add_subplot(gs[2, 0])
-        ax5.plot(x, main_contracts['最高'], 'ro-', label='最高', linewidth=2, markersize=8)
-        ax5.plot(x, main_contracts['最新价'], 'bo-', label='最新', linewidth=2, markersize=8)
-        ax5.plot(x, main_contracts['最低'], 'go-', label='最低', linewidth=2, markersize=8)
-        ax5.fill_between(x, main_contracts['最低'], main_contracts['最高'], alpha=0.2)
+        ax5.plot(x, highs, 'ro-', label='最高', linewidth=2, markersize=8)
+        ax5.plot(x, prices, 'bo-', label='最新', linewidth=2, markersize=8)
+        ax5.plot(x, lows, 'go-', label='最低', linewidth=2, markersize=8)
+        ax5.fill_between(x, lows, highs, alpha=0.2)
         ax5.set_title('价格区间', fontsize=12, fontweight='bold')
         ax5.set_xticks(x)
-        ax5.set_xticklabels(main_contracts['合约名称'], rotation=45, ha='right', fontsize=8)
+        ax5.set_xticklabels(names, rotation=45, ha='right', fontsize=8)
         ax5.legend()
         ax5.grid(True, alpha=0.3)
 
@@ -294,12 +392,12 @@ class DataVisualizer:
 
         # 创建表格数据
         table_data = []
-        for idx, row in main_contracts.head(5).iterrows():
+        for name, price, change, volume in zip(names[:5], prices[:5], changes[:5], volumes[:5]):
             table_data.append([
-                row['合约名称'],
-                f"{row['最新价']:.0f}",
-                f"{row['涨跌幅']:+.2f}%",
-                f"{row['成交量']/10000:.1f}万"
+                name,
+                f"{price:.0f}",
+                f"{change:+.2f}%",
+                f"{volume/10000:.1f}万"
             ])
 
         table = ax6.table(cellText=table_data,
@@ -323,13 +421,13 @@ class DataVisualizer:
 
         fig.suptitle('苹果期货市场综合分析仪表板', fontsize=18, fontweight='bold', y=0.98)
 
+        png_bytes = _to_png_bytes(fig, dpi=300 if high_res else 100)
+
         if save:
-            filepath = os.path.join(self.output_dir, 'comprehensive_dashboard.png')
-            plt.savefig(filepath, dpi=300, bbox_inches='tight')
+            filepath = self._save(png_bytes, 'comprehensive_dashboard.png')
             print(f"综合仪表板已保存: {filepath}")
 
-        plt.show()
-        return fig
+        return png_bytes
 
 
 # 测试代码
@@ -348,12 +446,12 @@ if __name__ == '__main__':
 
     print("正在生成图表...")
     print("\n1. 生成综合仪表板...")
-    visualizer.plot_comprehensive_dashboard(df)
+    visualizer.plot_comprehensive_dashboard(df, high_res=True)
 
     print("\n2. 生成价格对比图...")
-    visualizer.plot_price_comparison(df)
+    visualizer.plot_price_comparison(df, high_res=True)
 
     print("\n3. 生成成交量分析图...")
-    visualizer.plot_volume_analysis(df)
+    visualizer.plot_volume_analysis(df, high_res=True)
 
     print("\n所有图表生成完成！")
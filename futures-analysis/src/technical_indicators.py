@@ -5,11 +5,39 @@
 
 import pandas as pd
 import numpy as np
+from functools import lru_cache
+from dataclasses import dataclass
+
+from _kernels import wilder_ema
+
+
+@dataclass
+class PreparedPrices:
+    """预处理后的价格数据，供多个指标共用"""
+    arr: np.ndarray   # 价格数组
+    diff: np.ndarray  # 价格变动，首行为NaN
+    prev: np.ndarray  # 前一期价格，首行为NaN
 
 
 class TechnicalIndicators:
     """技术指标计算器"""
 
+    @staticmethod
+    def _precompute(prices):
+        """
+        一次性计算价格数组、价格变动和前一期价格
+
+        Args:
+            prices: 价格序列
+
+        Returns:
+            PreparedPrices: 预处理结果
+        """
+        arr = prices.to_numpy(dtype=np.float64)
+        diff = np.diff(arr, prepend=np.nan)
+        prev = np.concatenate(([np.nan], arr[:-1]))
+        return PreparedPrices(arr=arr, diff=diff, prev=prev)
+
     @staticmethod
     def calculate_ma(prices, period=5):
         """
@@ -39,23 +67,27 @@ class TechnicalIndicators:
         return prices.ewm(span=period, adjust=False).mean()
 
     @staticmethod
-    def calculate_rsi(prices, period=14):
+    def calculate_rsi(prices, period=14, prepared=None):
         """
         计算相对强弱指标 (Relative Strength Index)
 
         Args:
             prices: 价格序列
             period: 周期
+            prepared: 可选，_precompute(prices)的结果
 
         Returns:
-            pandas.Series: RSI值 (0-100)
+            pandas.Series: RSI值 (0-100)，首行价格变动不计入平滑，前period行为NaN
         """
+        if prepared is None:
+            prepared = TechnicalIndicators._precompute(prices)
+
         # 计算价格变动
-        delta = prices.diff()
+        delta = prepared.diff
 
-        # 分离上涨和下跌
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+        # 分离上涨和下跌（首行变动为NaN，不计入平滑），使用Wilder平滑
+        gain = pd.Series(wilder_ema(np.clip(delta, 0, None), period), index=prices.index)
+        loss = pd.Series(wilder_ema(np.clip(-delta, 0, None), period), index=prices.index)
 
         # 计算RS和RSI
         rs = gain / loss
@@ -147,11 +179,11 @@ class TechnicalIndicators:
 
         rsv = ((close - lowest_low) / (highest_high - lowest_low)) * 100
 
-        # 计算K值 (RSV的移动平均)
-        k = rsv.ewm(com=k_period-1, adjust=False).mean()
+        # 计算K值 (RSV的Wilder平滑)
+        k = pd.Series(wilder_ema(rsv.to_numpy(dtype=np.float64), k_period), index=close.index)
 
-        # 计算D值 (K值的移动平均)
-        d = k.ewm(com=d_period-1, adjust=False).mean()
+        # 计算D值 (K值的Wilder平滑)
+        d = pd.Series(wilder_ema(k.to_numpy(), d_period), index=close.index)
 
         # 计算J值
         j = 3 * k - 2 * d
@@ -163,7 +195,7 @@ class TechnicalIndicators:
         }
 
     @staticmethod
-    def calculate_atr(high, low, close, period=14):
+    def calculate_atr(high, low, close, period=14, prepared=None):
         """
         计算平均真实波幅 (Average True Range)
 
@@ -172,47 +204,66 @@ class TechnicalIndicators:
             low: 最低价序列
             close: 收盘价序列
             period: 周期
+            prepared: 可选，_precompute(close)的结果
 
         Returns:
             pandas.Series: ATR值
         """
-        # 计算真实波幅
-        tr1 = high - low
-        tr2 = abs(high - close.shift())
-        tr3 = abs(low - close.shift())
+        if prepared is None:
+            prepared = TechnicalIndicators._precompute(close)
 
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
+        h = high.to_numpy(dtype=float)
+        l = low.to_numpy(dtype=float)
+        prev_close = prepared.prev
 
-        # 计算ATR
-        atr = tr.rolling(window=period).mean()
+        # 计算真实波幅（fmax忽略NaN，首行取最高价-最低价）
+        tr = np.fmax.reduce([h - l, np.abs(h - prev_close), np.abs(l - prev_close)])
+
+        # 计算ATR (真实波幅的Wilder平滑)
+        atr = pd.Series(wilder_ema(tr, period), index=high.index)
 
         return atr
 
     @staticmethod
-    def calculate_obv(close, volume):
+    def calculate_obv(close, volume, prepared=None):
         """
         计算能量潮指标 (On Balance Volume)
 
         Args:
             close: 收盘价序列
             volume: 成交量序列
+            prepared: 可选，_precompute(close)的结果
 
         Returns:
             pandas.Series: OBV值
         """
-        obv = pd.Series(index=close.index, dtype=float)
-        obv.iloc[0] = volume.iloc[0]
+        if prepared is None:
+            prepared = TechnicalIndicators._precompute(close)
+
+        volume_arr = volume.to_numpy(dtype=float)
 
-        for i in range(1, len(close)):
-            if close.iloc[i] > close.iloc[i-1]:
-                obv.iloc[i] = obv.iloc[i-1] + volume.iloc[i]
-            elif close.iloc[i] < close.iloc[i-1]:
-                obv.iloc[i] = obv.iloc[i-1] - volume.iloc[i]
-            else:
-                obv.iloc[i] = obv.iloc[i-1]
+        # 价格上涨加成交量，下跌减成交量，持平不变
+        direction = np.sign(prepared.diff[1:])
+        signed_volume = np.concatenate((volume_arr[:1], np.nan_to_num(direction) * volume_arr[1:]))
+
+        obv = pd.Series(np.cumsum(signed_volume), index=close.index)
 
         return obv
 
+    @staticmethod
+    def _latest_ma(arr, periods):
+        """
+        计算多个周期移动平均线的最新值
+
+        Args:
+            arr: 价格数组 (numpy.ndarray)
+            periods: 周期列表
+
+        Returns:
+            list: 各周期的最新MA值，数据不足时为NaN
+        """
+        return [arr[-period:].mean() if len(arr) >= period else np.nan for period in periods]
+
     @staticmethod
     def analyze_trend(df):
         """
@@ -227,25 +278,41 @@ class TechnicalIndicators:
         if '最新价' not in df.columns:
             return {'error': '数据格式错误，缺少最新价列'}
 
-        prices = df['最新价']
+        arr = df['最新价'].to_numpy(dtype=np.float64)
+
+        # 以数据长度、最新价和更新时间作为指纹，数据未变化时直接复用结果
+        update_time = df['更新时间'].iloc[0] if '更新时间' in df.columns and len(df) > 0 else None
+        fingerprint = (len(arr), arr[-1] if len(arr) > 0 else None, update_time)
+
+        return dict(_analyze_cached(fingerprint, arr.tobytes()))
+
+    @staticmethod
+    def _analyze_prices(arr):
+        """
+        根据价格数组进行趋势分析
+
+        Args:
+            arr: 价格数组 (numpy.ndarray)
 
-        # 计算各种指标
-        ma5 = TechnicalIndicators.calculate_ma(prices, 5)
-        ma10 = TechnicalIndicators.calculate_ma(prices, 10)
-        ma20 = TechnicalIndicators.calculate_ma(prices, 20)
-        rsi = TechnicalIndicators.calculate_rsi(prices)
+        Returns:
+            dict: 趋势分析结果
+        """
+        prices = pd.Series(arr)
+
+        # 计算各种指标（均线只需最新值，直接在数组上计算）
+        ma5, ma10, ma20 = TechnicalIndicators._latest_ma(arr, (5, 10, 20))
+        prepared = TechnicalIndicators._precompute(prices)
+        rsi = TechnicalIndicators.calculate_rsi(prices, prepared=prepared)
         macd_data = TechnicalIndicators.calculate_macd(prices)
 
         # 趋势判断
         trend = '中性'
-        if len(ma5) > 0 and len(ma10) > 0:
-            latest_ma5 = ma5.iloc[-1]
-            latest_ma10 = ma10.iloc[-1]
-            latest_price = prices.iloc[-1]
+        if len(arr) > 0:
+            latest_price = arr[-1]
 
-            if latest_ma5 > latest_ma10 and latest_price > latest_ma5:
+            if ma5 > ma10 and latest_price > ma5:
                 trend = '上涨'
-            elif latest_ma5 < latest_ma10 and latest_price < latest_ma5:
+            elif ma5 < ma10 and latest_price < ma5:
                 trend = '下跌'
 
         # RSI超买超卖判断
@@ -276,14 +343,21 @@ class TechnicalIndicators:
             '整体趋势': trend,
             'RSI信号': rsi_signal,
             'MACD信号': macd_signal,
-            '最新价': prices.iloc[-1] if len(prices) > 0 else 0,
-            'MA5': ma5.iloc[-1] if len(ma5) > 0 and not np.isnan(ma5.iloc[-1]) else None,
-            'MA10': ma10.iloc[-1] if len(ma10) > 0 and not np.isnan(ma10.iloc[-1]) else None,
-            'MA20': ma20.iloc[-1] if len(ma20) > 0 and not np.isnan(ma20.iloc[-1]) else None,
-            'RSI': rsi.iloc[-1] if len(rsi) > 0 and not np.isnan(rsi.iloc[-1]) else None,
+            '最新价': float(prices.iloc[-1]) if len(prices) > 0 else 0,
+            'MA5': float(ma5) if not np.isnan(ma5) else None,
+            'MA10': float(ma10) if not np.isnan(ma10) else None,
+            'MA20': float(ma20) if not np.isnan(ma20) else None,
+            'RSI': float(rsi.iloc[-1]) if len(rsi) > 0 and not np.isnan(rsi.iloc[-1]) else None,
         }
 
 
+@lru_cache(maxsize=32)
+def _analyze_cached(fingerprint, prices_bytes):
+    """缓存趋势分析结果，fingerprint仅用于区分数据，实际计算基于prices_bytes"""
+    arr = np.frombuffer(prices_bytes, dtype=np.float64)
+    return TechnicalIndicators._analyze_prices(arr)
+
+
 # 测试代码
 if __name__ == '__main__':
     # 创建测试数据